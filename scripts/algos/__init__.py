@@ -0,0 +1,120 @@
+"""
+Algorithms of this project.
+
+Importing the package itself is cheap, the algorithm modules (and with them torch and
+stable_baselines3, about two seconds) are only imported on first access:
+
+    from algos import MSAC            # imports msac.py now
+    algo_class = get_algo("msac")     # same, looked up by its zoo name
+
+Process pools that need the algorithms in every worker should use ``worker_context``:
+the workers are forked from a server process that imported the algorithm modules once,
+instead of importing them again in every worker.
+"""
+import importlib
+import os
+import warnings
+
+# zoo algorithm name -> (module relative to this package, class name)
+ALGOS = {
+    "msac": (".msac", "MSAC"),
+    "sac": (".sac", "SAC"),
+}
+
+__all__ = ["ALGOS", "get_algo", "worker_context", "MSAC", "SAC"]
+
+# algorithms preloaded by the fork server of this process, see worker_context
+_preloaded = None
+# set while worker_context starts the fork server, holds the PYTHONPATH of the caller
+_FORKSERVER_PYTHONPATH = "ALGOS_FORKSERVER_PYTHONPATH"
+
+if _FORKSERVER_PYTHONPATH in os.environ:
+    # imported by the preload of the fork server: sys.path is set up now, restore the
+    # environment so the workers (and their subprocesses) do not inherit the changed PYTHONPATH
+    _python_path = os.environ.pop(_FORKSERVER_PYTHONPATH)
+    if _python_path:
+        os.environ["PYTHONPATH"] = _python_path
+    else:
+        os.environ.pop("PYTHONPATH", None)
+
+
+def get_algo(name):
+    """
+    Return the algorithm class registered under ``name``, importing its module on demand.
+
+    :param name: the algorithm name as used by the zoo (``msac``, ``sac``)
+    :return: the algorithm class
+    """
+    try:
+        module_name, class_name = ALGOS[name]
+    except KeyError:
+        raise ValueError(f"Unknown algorithm '{name}', available: {sorted(ALGOS)}") from None
+    module = importlib.import_module(module_name, __name__)
+    return getattr(module, class_name)
+
+
+def worker_context(*names):
+    """
+    Multiprocessing context for worker pools that use the given algorithms.
+    On platforms with ``forkserver`` the server imports the algorithm modules once and
+    every worker is forked from it, so a new worker starts without the import cost.
+    Elsewhere the default context is returned.
+
+    There is one fork server per process and its preload is fixed once it runs: the first
+    call decides which algorithms are preloaded. Workers that use other algorithms still
+    work, they import them on demand.
+
+    :param names: algorithm names to preload (``msac``, ``sac``), all if empty
+    :return: the multiprocessing context, e.g. for ``ProcessPoolExecutor(mp_context=...)``
+    """
+    import multiprocessing
+
+    global _preloaded
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context()
+    context = multiprocessing.get_context("forkserver")
+    names = names or tuple(ALGOS)
+    for name in names:
+        if name not in ALGOS:
+            raise ValueError(f"Unknown algorithm '{name}', available: {sorted(ALGOS)}")
+    if _preloaded is not None:
+        missing = sorted(set(names) - _preloaded)
+        if missing:
+            warnings.warn(f"The fork server is already running, {missing} are imported in every worker instead")
+        return context
+
+    from multiprocessing import forkserver, resource_tracker
+
+    context.set_forkserver_preload([__name__ + ALGOS[name][0] for name in names])
+    # the fork server does not inherit sys.path, only the environment: start it now with the
+    # scripts folder on PYTHONPATH, the server restores the original value when it imports this
+    # package and the caller gets it back below
+    resource_tracker.ensure_running()
+    scripts_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    python_path = os.environ.get("PYTHONPATH")
+    os.environ[_FORKSERVER_PYTHONPATH] = python_path or ""
+    os.environ["PYTHONPATH"] = os.pathsep.join([scripts_folder] + ([python_path] if python_path else []))
+    try:
+        forkserver.ensure_running()
+    finally:
+        del os.environ[_FORKSERVER_PYTHONPATH]
+        if python_path is None:
+            del os.environ["PYTHONPATH"]
+        else:
+            os.environ["PYTHONPATH"] = python_path
+    _preloaded = set(names)
+    return context
+
+
+def __getattr__(name):
+    for algo_name, (_, class_name) in ALGOS.items():
+        if class_name == name:
+            algo_class = get_algo(algo_name)
+            # cache on the package so the lookup only happens once
+            globals()[name] = algo_class
+            return algo_class
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+
+def __dir__():
+    return sorted(list(globals()) + [class_name for _, class_name in ALGOS.values()])
@@ -0,0 +1,131 @@
+"""
+Helpers for data-parallel training over ``torch.distributed``.
+
+Every rank samples its own shard of the minibatch, gradients are averaged with
+an all-reduce and batch statistics are reduced over all shards, so an update
+with ``batch_size`` split over ``world_size`` ranks matches a single process
+update on the concatenated batch.
+"""
+from typing import Iterable
+
+import torch as th
+import torch.distributed as dist
+
+
+def check_process_group() -> int:
+    """
+    Make sure the default process group is set up.
+
+    :return: the number of ranks in the process group
+    """
+    if not (dist.is_available() and dist.is_initialized()):
+        raise RuntimeError(
+            "Distributed training requires an initialized process group, "
+            "call torch.distributed.init_process_group('gloo') first"
+        )
+    return dist.get_world_size()
+
+
+def broadcast_parameters(parameters: Iterable[th.Tensor], src: int = 0) -> None:
+    """
+    Overwrite the parameters of all ranks with the ones of rank ``src``.
+
+    :param parameters: parameters to synchronize
+    :param src: rank that holds the reference parameters
+    """
+    with th.no_grad():
+        for param in parameters:
+            dist.broadcast(param.data, src=src)
+
+
+def broadcast_rng_state(src: int = 0) -> th.Tensor:
+    """
+    State of the CPU random number generator of rank ``src``, e.g. to draw the same noise on all ranks.
+
+    :param src: rank whose state is used
+    :return: the generator state (see ``torch.get_rng_state``)
+    """
+    state = th.get_rng_state()
+    dist.broadcast(state, src=src)
+    return state
+
+
+def all_reduce_gradients(parameters: Iterable[th.Tensor]) -> None:
+    """
+    Average the gradients of ``parameters`` over all ranks.
+    The gradients are flattened into one buffer so only one all-reduce is issued.
+
+    :param parameters: parameters whose ``.grad`` is averaged in place
+    """
+    grads = [param.grad for param in parameters if param.grad is not None]
+    if len(grads) == 0:
+        return
+    flat_grads = th.cat([grad.reshape(-1) for grad in grads])
+    dist.all_reduce(flat_grads, op=dist.ReduceOp.SUM)
+    flat_grads /= dist.get_world_size()
+    offset = 0
+    for grad in grads:
+        numel = grad.numel()
+        grad.copy_(flat_grads[offset : offset + numel].view_as(grad))
+        offset += numel
+
+
+def batch_mean(tensor: th.Tensor, distributed: bool = False) -> th.Tensor:
+    """
+    Mean over the whole minibatch.
+
+    :param tensor: local shard of the batch
+    :param distributed: reduce over all ranks instead of the local shard only
+    :return: the mean as a scalar tensor
+    """
+    if not distributed:
+        return th.mean(tensor)
+    total = th.stack([tensor.sum(), tensor.new_tensor(tensor.numel())])
+    dist.all_reduce(total, op=dist.ReduceOp.SUM)
+    return total[0] / total[1]
+
+
+def batch_min(tensor: th.Tensor, distributed: bool = False) -> th.Tensor:
+    """
+    Minimum over the whole minibatch.
+
+    :param tensor: local shard of the batch
+    :param distributed: reduce over all ranks instead of the local shard only
+    :return: the minimum as a scalar tensor
+    """
+    minimum = th.min(tensor)
+    if distributed:
+        minimum = minimum.clone()
+        dist.all_reduce(minimum, op=dist.ReduceOp.MIN)
+    return minimum
+
+
+def batch_max(tensor: th.Tensor, distributed: bool = False) -> th.Tensor:
+    """
+    Maximum over the whole minibatch.
+
+    :param tensor: local shard of the batch
+    :param distributed: reduce over all ranks instead of the local shard only
+    :return: the maximum as a scalar tensor
+    """
+    maximum = th.max(tensor)
+    if distributed:
+        maximum = maximum.clone()
+        dist.all_reduce(maximum, op=dist.ReduceOp.MAX)
+    return maximum
+
+
+def batch_median(tensor: th.Tensor, distributed: bool = False) -> th.Tensor:
+    """
+    Median over the whole minibatch.
+    The median can not be reduced, so the shards (which all have the same size) are gathered.
+
+    :param tensor: local shard of the batch
+    :param distributed: reduce over all ranks instead of the local shard only
+    :return: the median as a scalar tensor
+    """
+    if not distributed:
+        return th.median(tensor)
+    shards = [th.empty_like(tensor) for _ in range(dist.get_world_size())]
+    dist.all_gather(shards, tensor.contiguous())
+    return th.median(th.cat(shards))
@@ -8,10 +8,21 @@ from torch.nn import functional as F
 from stable_baselines3.common.buffers import ReplayBuffer
 from stable_baselines3.common.noise import ActionNoise
 from stable_baselines3 import SAC
-from stable_baselines3.common.type_aliases import GymEnv, MaybeCallback, Schedule
+from stable_baselines3.common.type_aliases import GymEnv, MaybeCallback, Schedule, TrainFrequencyUnit
 from stable_baselines3.common.utils import polyak_update
 from stable_baselines3.sac.policies import SACPolicy
 
+from .distributed import (
+    all_reduce_gradients,
+    batch_max,
+    batch_mean,
+    batch_median,
+    batch_min,
+    broadcast_parameters,
+    broadcast_rng_state,
+    check_process_group,
+)
+
 
 class MSAC(SAC):
     """
@@ -66,6 +77,11 @@ class MSAC(SAC):
     :param munchausen_clipping_high: Munchausen term clipping coefficient high. limits the log-policy term,
         otherwise numerical problems may occur if the policy becomes too deterministic.
     :param munchausen_mode: To test different approaches
+    :param distributed: Data-parallel training over ``torch.distributed`` (e.g. with the gloo backend).
+        Every rank samples ``batch_size / world_size`` transitions from its own replay buffer,
+        gradients are averaged over all ranks and the Munchausen batch statistics are computed
+        over the whole batch. With gSDE all ranks draw the same exploration matrices for the update.
+        The process group must be initialized before ``learn`` is called.
     """
 
     def __init__(
@@ -102,7 +118,8 @@ class MSAC(SAC):
         munchausen_clipping_high: float = 1.0,
         munchausen_mode: str = "default",
         dynamicshift_hyperparameter: float = 0.0,
-        munchausen_state_based: bool = True
+        munchausen_state_based: bool = True,
+        distributed: bool = False,
     ):
 
         super(MSAC, self).__init__(
@@ -141,7 +158,51 @@ class MSAC(SAC):
         self.munchausen_mode = munchausen_mode
         self.dynamicshift_hyperparameter = dynamicshift_hyperparameter
         self.munchausen_state_based = munchausen_state_based
-
+        self.distributed = distributed
+
+    def _setup_model(self) -> None:
+        super(MSAC, self)._setup_model()
+        # parameters are broadcast from rank 0 before the first distributed update
+        self._distributed_synced = False
+        # generator state shared by all ranks for the gSDE exploration matrices
+        self._noise_rng_state = None
+
+    def _setup_distributed(self, batch_size: int) -> int:
+        """
+        Synchronize the ranks before the first update and compute the local shard size.
+
+        :param batch_size: global minibatch size
+        :return: number of transitions each rank samples
+        """
+        world_size = check_process_group()
+        if batch_size % world_size != 0:
+            raise ValueError(f"batch_size ({batch_size}) must be divisible by the number of ranks ({world_size})")
+        if self.train_freq.unit != TrainFrequencyUnit.STEP:
+            # all ranks must call train() the same number of times
+            raise ValueError("Distributed training requires a train_freq in steps")
+        if self.use_sde and self.device.type != "cpu":
+            # the exploration matrices are drawn from a shared CPU generator state
+            raise ValueError("Distributed training with gSDE requires device='cpu'")
+
+        if not self._distributed_synced:
+            parameters = list(self.policy.parameters())
+            if self.ent_coef_optimizer is not None:
+                parameters.append(self.log_ent_coef)
+            broadcast_parameters(parameters)
+            self._noise_rng_state = broadcast_rng_state()
+            self._distributed_synced = True
+        return batch_size // world_size
+
+    def _reset_noise_distributed(self) -> None:
+        """
+        Sample the gSDE exploration matrices with the same noise on all ranks.
+        The targets of every shard then use the matrices of a single process update,
+        the exploration noise of each rank (the rollouts) is not affected.
+        """
+        with th.random.fork_rng(devices=[]):
+            th.set_rng_state(self._noise_rng_state)
+            self.actor.reset_noise()
+            self._noise_rng_state = th.get_rng_state()
 
     def train(self, gradient_steps: int, batch_size: int = 64) -> None:
         # Update optimizers learning rate
@@ -155,13 +216,19 @@ class MSAC(SAC):
         ent_coef_losses, ent_coefs = [], []
         actor_losses, critic_losses = [], []
 
+        if self.distributed:
+            batch_size = self._setup_distributed(batch_size)
+
         for gradient_step in range(gradient_steps):
             # Sample replay buffer
             replay_data = self.replay_buffer.sample(batch_size, env=self._vec_normalize_env)
 
             # We need to sample because `log_std` may have changed between two gradient steps
             if self.use_sde:
-                self.actor.reset_noise()
+                if self.distributed:
+                    self._reset_noise_distributed()
+                else:
+                    self.actor.reset_noise()
 
             # Action by the current actor for the sampled state
             actions_pi, log_prob = self.actor.action_log_prob(replay_data.observations)
@@ -190,6 +257,8 @@ class MSAC(SAC):
             if ent_coef_loss is not None:
                 self.ent_coef_optimizer.zero_grad()
                 ent_coef_loss.backward()
+                if self.distributed:
+                    all_reduce_gradients([self.log_ent_coef])
                 self.ent_coef_optimizer.step()
 
             with th.no_grad():
@@ -214,8 +283,9 @@ class MSAC(SAC):
 
                     elif (self.munchausen_mode == "dynamicshift_clipping"):
                         # Action based Munchausen clipping and with dynamicshift
+                        replay_log_prob_mean = batch_mean(replay_log_prob, self.distributed)
                         next_munchausen_values = ent_coef * (
-                                    replay_log_prob - th.mean(replay_log_prob) + self.dynamicshift_hyperparameter)
+                                    replay_log_prob - replay_log_prob_mean + self.dynamicshift_hyperparameter)
                         self.logger.record("munchausen/replay_log_prob_shifted", next_munchausen_values / ent_coef)
                         next_munchausen_values = self.munchausen_scaling * th.clamp(next_munchausen_values,
                                                                                     self.munchausen_clipping_low,
@@ -223,8 +293,9 @@ class MSAC(SAC):
 
                     elif (self.munchausen_mode == "dynamicshift"):
                         # Action based Munchausen without clipping and with dynamicshift
+                        replay_log_prob_mean = batch_mean(replay_log_prob, self.distributed)
                         next_munchausen_values = ent_coef * (
-                                    replay_log_prob - th.mean(replay_log_prob) + self.dynamicshift_hyperparameter)
+                                    replay_log_prob - replay_log_prob_mean + self.dynamicshift_hyperparameter)
                         self.logger.record("munchausen/replay_log_prob_shifted", next_munchausen_values / ent_coef)
                         next_munchausen_values = self.munchausen_scaling * next_munchausen_values
                         self.munchausen_clipping_low = None
@@ -253,14 +324,17 @@ class MSAC(SAC):
                         #  0 = dynamicshift_mean
                         #  1 = dynamicshift_min
 
+                        log_prob_mean = batch_mean(log_prob, self.distributed)
                         if self.dynamicshift_hyperparameter <= 0.0:
+                            log_prob_max = batch_max(log_prob, self.distributed)
                             next_munchausen_values = ent_coef * (log_prob - (1.0 + self.dynamicshift_hyperparameter)
-                                                                 * th.mean(log_prob) + self.dynamicshift_hyperparameter
-                                                                 * th.max(log_prob))
+                                                                 * log_prob_mean + self.dynamicshift_hyperparameter
+                                                                 * log_prob_max)
                         else:
+                            log_prob_min = batch_min(log_prob, self.distributed)
                             next_munchausen_values = ent_coef * (log_prob + (self.dynamicshift_hyperparameter - 1.0)
-                                                                 * th.mean(log_prob)- self.dynamicshift_hyperparameter
-                                                                 * th.min(log_prob))
+                                                                 * log_prob_mean - self.dynamicshift_hyperparameter
+                                                                 * log_prob_min)
 
                         self.logger.record("munchausen/log_policy_shifted", next_munchausen_values / ent_coef)
                         next_munchausen_values = self.munchausen_scaling * next_munchausen_values
@@ -268,7 +342,8 @@ class MSAC(SAC):
 
                     elif (self.munchausen_mode == "dynamicshift"):
                         # State based Munchausen without clipping and with dynamicshift
-                        next_munchausen_values = ent_coef * (log_prob - th.mean(log_prob) + self.dynamicshift_hyperparameter)
+                        log_prob_mean = batch_mean(log_prob, self.distributed)
+                        next_munchausen_values = ent_coef * (log_prob - log_prob_mean + self.dynamicshift_hyperparameter)
                         self.logger.record("munchausen/log_policy_shifted", next_munchausen_values / ent_coef)
                         next_munchausen_values = self.munchausen_scaling * next_munchausen_values
                         self.munchausen_clipping_low = None
@@ -276,7 +351,7 @@ class MSAC(SAC):
 
                     elif (self.munchausen_mode == "dynamicshift_median"):
                         # State based Munchausen without clipping and with median dynamicshift
-                        next_munchausen_values = ent_coef * (log_prob - th.median(log_prob))
+                        next_munchausen_values = ent_coef * (log_prob - batch_median(log_prob, self.distributed))
                         self.logger.record("munchausen/log_policy_shifted_median", next_munchausen_values/ent_coef)
                         next_munchausen_values = self.munchausen_scaling * next_munchausen_values
                         self.munchausen_clipping_low = None
@@ -293,10 +368,12 @@ class MSAC(SAC):
 
                     elif (self.munchausen_mode == "dynamicshift_normalized"):
                         # State based Munchausen without clipping, with dynamicshift that is amplitude normalized to  1
-                        if (th.min(log_prob) < self.log_prob_min):
-                            self.log_prob_min = th.min(log_prob)
-                        if (th.max(log_prob) > self.log_prob_max):
-                            self.log_prob_max = th.max(log_prob)
+                        log_prob_batch_min = batch_min(log_prob, self.distributed)
+                        log_prob_batch_max = batch_max(log_prob, self.distributed)
+                        if (log_prob_batch_min < self.log_prob_min):
+                            self.log_prob_min = log_prob_batch_min
+                        if (log_prob_batch_max > self.log_prob_max):
+                            self.log_prob_max = log_prob_batch_max
                         min_old = self.log_prob_min
                         max_old = self.log_prob_max
                         min_new = th.ones_like(min_old) * -1
@@ -319,7 +396,8 @@ class MSAC(SAC):
 
 
                 # td error + Munchausen term + entropy term
-                target_q_values = replay_data.rewards + next_munchausen_values + (1 - replay_data.dones) * self.gamma * next_q_values
+                target_q_values = (replay_data.rewards + next_munchausen_values
+                                   + (1 - replay_data.dones) * self.gamma * next_q_values)
 
             # Get current Q-values estimates for each critic network
             # using action from the replay buffer
@@ -332,6 +410,8 @@ class MSAC(SAC):
             # Optimize the critic
             self.critic.optimizer.zero_grad()
             critic_loss.backward()
+            if self.distributed:
+                all_reduce_gradients(self.critic.parameters())
             self.critic.optimizer.step()
 
             # Compute actor loss
@@ -345,6 +425,8 @@ class MSAC(SAC):
             # Optimize the actor
             self.actor.optimizer.zero_grad()
             actor_loss.backward()
+            if self.distributed:
+                all_reduce_gradients(self.actor.parameters())
             self.actor.optimizer.step()
 
             # Update target networks
@@ -404,4 +486,4 @@ class MSAC(SAC):
         )
 
     def _excluded_save_params(self) -> List[str]:
-        return super(MSAC, self)._excluded_save_params() + ["actor", "critic", "critic_target"]
+        return super(MSAC, self)._excluded_save_params() + ["actor", "critic", "critic_target", "_noise_rng_state"]
@@ -0,0 +1,176 @@
+"""
+Startup benchmark for the algorithms.
+
+Measures two things:
+- the cumulative import time of a module (``python -X importtime`` in a fresh interpreter),
+  by default ``algos.msac``, which pulls in torch and stable_baselines3
+- the time until a fresh pool worker has the algorithm class ready, once with ``spawn``
+  (every worker imports torch and stable_baselines3) and once with ``algos.worker_context``
+  (workers are forked from a server that already imported them)
+
+and fails if the import or the worker startup is over budget.
+
+Usage (from the repository root):
+`python scripts/benchmark_import_time.py --module algos.msac --algo msac`
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+HEAVY_MODULES = ("gym", "torch", "stable_baselines3")
+
+# budgets shared by the command line and scripts/tests/test_import_time.py
+# the package only, the algorithms are loaded on first access (about 3 ms)
+ALGOS_IMPORT_BUDGET_MS = 50.0
+# algos.msac: torch (which already loads torch.distributed), stable_baselines3 and gym, about 2.5-3 s
+MSAC_IMPORT_BUDGET_MS = 3500.0
+# a worker forked from the preloaded server, about 35 ms (about 3 s with spawn)
+PRELOADED_WORKER_BUDGET_MS = 500.0
+
+SCRIPTS_FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """
+    Parse the output of ``-X importtime``.
+
+    :param stderr: stderr of the interpreter run with ``-X importtime``
+    :return: cumulative import time in microseconds per module name
+    """
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            # header line
+            continue
+        cumulative[fields[2].strip()] = int(fields[1])
+    return cumulative
+
+
+def measure(module: str, cwd: str = SCRIPTS_FOLDER) -> Dict[str, int]:
+    """
+    Import ``module`` in a fresh interpreter and return the parsed import times.
+
+    :param module: module to import
+    :param cwd: working directory of the interpreter (must contain the module)
+    :return: cumulative import time in microseconds per module name
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+    return parse_importtime(result.stderr)
+
+
+def heavy_modules(cumulative: Dict[str, int]) -> List[str]:
+    """
+    :param cumulative: parsed import times, see ``measure``
+    :return: the heavy top level packages that were imported
+    """
+    return sorted({name.split(".")[0] for name in cumulative if name.split(".")[0] in HEAVY_MODULES})
+
+
+def _load_algo(name: str) -> str:
+    # runs in the pool worker
+    from algos import get_algo
+
+    return get_algo(name).__name__
+
+
+def worker_startup_ms(context: multiprocessing.context.BaseContext, algo: str) -> float:
+    """
+    Time from creating a one-worker pool until the worker returned the algorithm class.
+
+    :param context: multiprocessing context of the pool
+    :param algo: algorithm name (``msac``, ``sac``)
+    :return: the startup time in milliseconds
+    """
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        executor.submit(_load_algo, algo).result()
+    return (time.perf_counter() - start) * 1000
+
+
+def preloaded_worker_startup_ms(algo: str, repeats: int) -> List[float]:
+    """
+    Worker startup times with ``algos.worker_context``.
+    The first pool starts the fork server (and pays the import once), it is not part of the result.
+
+    :param algo: algorithm name (``msac``, ``sac``)
+    :param repeats: number of measured pools
+    :return: the startup times in milliseconds
+    """
+    if SCRIPTS_FOLDER not in sys.path:
+        sys.path.insert(0, SCRIPTS_FOLDER)
+    from algos import worker_context
+
+    context = worker_context(algo)
+    worker_startup_ms(context, algo)
+    return [worker_startup_ms(context, algo) for _ in range(repeats)]
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", help="Module to import", default="algos.msac", type=str)
+    parser.add_argument("--budget-ms", help="Import time budget in milliseconds", default=MSAC_IMPORT_BUDGET_MS, type=float)
+    parser.add_argument("--repeats", help="Number of measurements, the median is compared", default=3, type=int)
+    parser.add_argument(
+        "--no-heavy", help="Fail if gym, torch or stable_baselines3 are imported by the module", action="store_true"
+    )
+    parser.add_argument("--algo", help="Algorithm loaded by the pool workers", default="msac", type=str)
+    parser.add_argument(
+        "--worker-budget-ms",
+        help="Startup budget of a preloaded pool worker in milliseconds",
+        default=PRELOADED_WORKER_BUDGET_MS,
+        type=float,
+    )
+    parser.add_argument("--skip-spawn", help="Do not measure the spawn start method", action="store_true")
+    args = parser.parse_args(args)
+
+    failed = False
+    timings_ms = []
+    heavy = set()
+    for _ in range(args.repeats):
+        cumulative = measure(args.module)
+        timings_ms.append(cumulative[args.module] / 1000)
+        heavy.update(heavy_modules(cumulative))
+    median_ms = statistics.median(timings_ms)
+    print(f"import {args.module}: {median_ms:.1f} ms (median of {args.repeats}, budget {args.budget_ms:.1f} ms)")
+    if median_ms > args.budget_ms:
+        print(f"FAIL: import time exceeds the budget of {args.budget_ms:.1f} ms")
+        failed = True
+    if heavy and args.no_heavy:
+        print(f"FAIL: heavy dependencies loaded at import time: {', '.join(sorted(heavy))}")
+        failed = True
+
+    if not args.skip_spawn:
+        spawn_ms = statistics.median(
+            worker_startup_ms(multiprocessing.get_context("spawn"), args.algo) for _ in range(args.repeats)
+        )
+        print(f"spawn worker with {args.algo}: {spawn_ms:.1f} ms (median of {args.repeats})")
+    preloaded_ms = statistics.median(preloaded_worker_startup_ms(args.algo, args.repeats))
+    print(
+        f"preloaded worker with {args.algo}: {preloaded_ms:.1f} ms "
+        f"(median of {args.repeats}, budget {args.worker_budget_ms:.1f} ms)"
+    )
+    if preloaded_ms > args.worker_budget_ms:
+        print(f"FAIL: worker startup exceeds the budget of {args.worker_budget_ms:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""
+Reward comparison plots from the training monitor files with bounded memory.
+
+Every ``0.monitor.csv`` is read in chunks. The rolling mean and std of the episode
+reward (window in episodes) are computed on the fly and resampled onto a common
+timestep grid. Runs of the same algorithm and experiment (e.g. msac state_based)
+are aggregated over the seeds with Welford accumulators, so memory only depends on
+the grid size and the window, not on the number or length of the runs.
+
+Usage (from the repository root):
+`python scripts/plot_monitor.py --algo sac msac --env AntBulletEnv-v0 -f docs/results -o docs/images --episode-window 500`
+"""
+import argparse
+import glob
+import os
+import re
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Tuple
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+try:
+    import seaborn
+
+    seaborn.set()
+except ImportError:
+    seaborn = None
+
+
+class Welford:
+    """
+    Element-wise running mean and standard deviation (Welford's algorithm).
+    NaN entries of an update are ignored, so runs of different lengths can be combined.
+
+    :param shape: shape of the accumulated arrays
+    """
+
+    def __init__(self, shape: Tuple[int, ...]):
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.mean = np.zeros(shape, dtype=np.float64)
+        self.m2 = np.zeros(shape, dtype=np.float64)
+
+    def update(self, values: np.ndarray) -> None:
+        valid = ~np.isnan(values)
+        self.count[valid] += 1
+        delta = values[valid] - self.mean[valid]
+        self.mean[valid] += delta / self.count[valid]
+        self.m2[valid] += delta * (values[valid] - self.mean[valid])
+
+    def result(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :return: mean and (population) standard deviation, NaN where nothing was accumulated
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(self.count > 0, self.mean, np.nan)
+            std = np.sqrt(np.where(self.count > 0, self.m2 / self.count, np.nan))
+        return mean, std
+
+
+def iter_monitor_chunks(path: str, chunksize: int) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Stream a monitor file.
+
+    :param path: path to a ``*.monitor.csv`` file
+    :param chunksize: number of episodes per chunk
+    :return: iterator over (episode rewards, episode lengths) per chunk
+    """
+    # the first line is a json header with t_start and env_id
+    for chunk in pd.read_csv(path, skiprows=1, usecols=["r", "l"], chunksize=chunksize):
+        yield chunk["r"].to_numpy(dtype=np.float64), chunk["l"].to_numpy(dtype=np.int64)
+
+
+def rolling_on_grid(path: str, grid: np.ndarray, window: int, chunksize: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Rolling mean and std of the episode reward of one run, resampled onto ``grid``.
+    Every grid point gets the value of the last episode finished at or before it;
+    until ``window`` episodes are done the window covers all episodes so far.
+
+    :param path: path to a ``*.monitor.csv`` file
+    :param grid: increasing timesteps to sample at
+    :param window: rolling window in episodes
+    :param chunksize: number of episodes read at once
+    :return: rolling mean and rolling std on the grid, NaN outside of the run
+    """
+    grid_mean = np.full(len(grid), np.nan)
+    grid_std = np.full(len(grid), np.nan)
+    # last window - 1 rewards of the previous chunks
+    history = np.empty(0)
+    last_timestep = 0
+    last_mean, last_std = np.nan, np.nan
+
+    for rewards, lengths in iter_monitor_chunks(path, chunksize):
+        if len(rewards) == 0:
+            continue
+        timesteps = last_timestep + np.cumsum(lengths)
+        extended = np.concatenate([history, rewards])
+        # window sums from cumulative sums, restarted every chunk and shifted by the
+        # chunk mean to keep the cancellation error of the variance small
+        shift = extended.mean()
+        sums = np.concatenate([[0.0], np.cumsum(extended - shift)])
+        squared_sums = np.concatenate([[0.0], np.cumsum((extended - shift) ** 2)])
+        end = np.arange(len(history), len(extended)) + 1
+        start = np.maximum(end - window, 0)
+        count = end - start
+        shifted_mean = (sums[end] - sums[start]) / count
+        std = np.sqrt(np.maximum((squared_sums[end] - squared_sums[start]) / count - shifted_mean ** 2, 0.0))
+        mean = shifted_mean + shift
+
+        in_chunk = (grid > last_timestep) & (grid <= timesteps[-1])
+        episode = np.searchsorted(timesteps, grid[in_chunk], side="right") - 1
+        # grid points before the first episode of this chunk belong to the last episode of the previous one
+        grid_mean[in_chunk] = np.where(episode >= 0, mean[episode], last_mean)
+        grid_std[in_chunk] = np.where(episode >= 0, std[episode], last_std)
+
+        last_timestep = timesteps[-1]
+        last_mean, last_std = mean[-1], std[-1]
+        history = extended[max(len(extended) - (window - 1), 0) :]
+
+    return grid_mean, grid_std
+
+
+def find_monitor_files(folder: str, algos: List[str], env: str, exp: List[str]) -> Dict[str, List[str]]:
+    """
+    Group the monitor files of all seeds of each algorithm and experiment.
+    Run folders are named ``<env>_<seed>[_<experiment>]``.
+
+    :param folder: results folder (e.g. docs/results)
+    :param algos: algorithms to include
+    :param env: environment id
+    :param exp: only include these experiments (e.g. state_based), all if empty
+    :return: monitor files per label, e.g. ``{"MSAC state_based": [...]}``
+    """
+    groups = OrderedDict()
+    pattern = re.compile(rf"^{re.escape(env)}_(\d+)(?:_(.+))?$")
+    for algo in algos:
+        for run in sorted(glob.glob(os.path.join(folder, algo, f"{env}_*"))):
+            match = pattern.match(os.path.basename(run))
+            if match is None:
+                continue
+            experiment = match.group(2)
+            if exp and experiment not in exp:
+                continue
+            label = algo.upper() if experiment is None else f"{algo.upper()} {experiment}"
+            groups.setdefault(label, []).extend(sorted(glob.glob(os.path.join(run, "*monitor.csv"))))
+    return groups
+
+
+def plot_comparison(
+    grid: np.ndarray, results: Dict[str, Tuple[np.ndarray, np.ndarray]], title: str, ylabel: str, path: str
+) -> None:
+    """
+    Plot the mean over seeds with a band of one standard deviation.
+
+    :param grid: timesteps
+    :param results: mean and std over seeds per label
+    :param title: figure title
+    :param ylabel: y-axis label
+    :param path: output file
+    """
+    fig = plt.figure(title)
+    for label, (mean, std) in results.items():
+        plt.plot(grid / 1e6, mean, label=label)
+        plt.fill_between(grid / 1e6, mean - std, mean + std, alpha=0.3)
+    plt.title(title, fontsize=14)
+    plt.xlabel("Timesteps (in Million)", fontsize=14)
+    plt.ylabel(ylabel, fontsize=14)
+    plt.legend()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--algo", help="RL Algorithms", nargs="+", type=str, default=["sac", "msac"])
+    parser.add_argument("--env", help="Environment IDs", nargs="+", type=str, required=True)
+    parser.add_argument("-exp", "--exp", help="Experiments to include (e.g. state_based)", nargs="*", default=[])
+    parser.add_argument("-f", "--folder", help="Results folder", type=str, default="docs/results")
+    parser.add_argument("-o", "--output-folder", help="Output folder", type=str, default="docs/images")
+    parser.add_argument("--episode-window", help="Rolling window size in episodes", type=int, default=500)
+    parser.add_argument("-max", "--max-timesteps", help="Last timestep of the grid", type=int, default=1000000)
+    parser.add_argument("--n-points", help="Number of points of the timestep grid", type=int, default=200)
+    parser.add_argument("--chunksize", help="Number of episodes read at once", type=int, default=10000)
+    args = parser.parse_args()
+
+    os.makedirs(args.output_folder, exist_ok=True)
+    grid = np.linspace(args.max_timesteps / args.n_points, args.max_timesteps, args.n_points)
+
+    for env in args.env:
+        groups = find_monitor_files(args.folder, args.algo, env, args.exp)
+        if len(groups) == 0:
+            print(f"No monitor files found for {env}")
+            continue
+
+        reward_results, std_results = OrderedDict(), OrderedDict()
+        for label, paths in groups.items():
+            reward_acc, std_acc = Welford(grid.shape), Welford(grid.shape)
+            for path in paths:
+                rolling_mean, rolling_std = rolling_on_grid(path, grid, args.episode_window, args.chunksize)
+                reward_acc.update(rolling_mean)
+                std_acc.update(rolling_std)
+            reward_results[label] = reward_acc.result()
+            std_results[label] = std_acc.result()
+            print(f"{env} {label}: {len(paths)} seeds")
+
+        reward_path = os.path.join(args.output_folder, f"Monitor_Reward_Comparison_{env}.png")
+        plot_comparison(grid, reward_results, env, "Mean Reward", reward_path)
+        std_path = os.path.join(args.output_folder, f"Monitor_Std_Comparison_{env}.png")
+        plot_comparison(grid, std_results, env, "Reward Std", std_path)
+
+
+if __name__ == "__main__":
+    main()
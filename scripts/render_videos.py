@@ -0,0 +1,328 @@
+"""
+Batch rendering of trained agents into videos or GIFs.
+
+All runs found under ``--folder`` (layout of docs/results: ``<algo>/<env>_<exp_id>[_<suffix>]``)
+are rolled out in a process pool. Every worker renders offscreen (``rgb_array``) and
+streams the raw frames into an ffmpeg subprocess, so no frames are kept in memory.
+ffmpeg must be on the PATH. Classic control environments (e.g. MountainCarContinuous-v0)
+open a window to render, run them with a virtual display (``xvfb-run``).
+
+The files are named like the existing videos, ``training_<algo>_<env>_<seed>.mp4``
+(``--name-format`` changes that). Runs with the same name get the suffix of their folder
+appended, e.g. ``training_msac_AntBulletEnv-v0_1_state_based.mp4``. Besides the final model,
+the best model (``--load-best``) or the checkpoints ``rl_model_<steps>_steps.zip``
+(``--load-checkpoint``, ``--load-last-checkpoint``) can be rendered, as in the zoo.
+
+Usage (from the repository root):
+`python scripts/render_videos.py --algo sac msac --env AntBulletEnv-v0 -f docs/results -o docs/images/videos --load-best`
+"""
+import argparse
+import glob
+import os
+import re
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, NamedTuple, Optional, Tuple
+
+import yaml
+
+from algos import ALGOS, worker_context
+
+# checkpoints of the zoo CheckpointCallback
+CHECKPOINT_PATTERN = re.compile(r"rl_model_(\d+)_steps\.zip")
+
+
+class Run(NamedTuple):
+    algo: str
+    env_id: str
+    # name of the run folder, e.g. AntBulletEnv-v0_1_state_based
+    name: str
+    path: str
+    model_path: str
+    seed: int
+    # timesteps of the checkpoint, None for the final or best model
+    checkpoint: Optional[int] = None
+
+
+def run_seed(path: str, env_id: str, name: str) -> int:
+    """
+    Seed of a run, read from the stored ``args.yml``.
+    Falls back to the experiment id in the folder name (``<env>_<exp_id>[_<suffix>]``).
+
+    :param path: run folder
+    :param env_id: environment ID
+    :param name: name of the run folder
+    :return: the seed
+    """
+    args_path = os.path.join(path, env_id, "args.yml")
+    if os.path.isfile(args_path):
+        with open(args_path) as f:
+            args = dict(yaml.load(f, Loader=yaml.UnsafeLoader))
+        if args.get("seed") is not None:
+            return int(args["seed"])
+    return int(name[len(env_id) + 1 :].split("_")[0])
+
+
+def model_file(
+    path: str, env_id: str, load_best: bool, load_checkpoint: Optional[int], load_last_checkpoint: bool
+) -> Tuple[str, Optional[int]]:
+    """
+    Select the model of a run, like the zoo's ``enjoy.py``.
+
+    :param path: run folder
+    :param env_id: environment ID
+    :param load_best: use ``best_model.zip``
+    :param load_checkpoint: use the checkpoint ``rl_model_<load_checkpoint>_steps.zip``
+    :param load_last_checkpoint: use the checkpoint with the most timesteps
+    :return: the model path and the checkpoint timesteps (None if it is not a checkpoint)
+    """
+    if load_checkpoint is not None:
+        return os.path.join(path, f"rl_model_{load_checkpoint}_steps.zip"), load_checkpoint
+    if load_last_checkpoint:
+        checkpoints = [CHECKPOINT_PATTERN.fullmatch(file) for file in os.listdir(path)]
+        steps = [int(match.group(1)) for match in checkpoints if match is not None]
+        if len(steps) == 0:
+            return os.path.join(path, "rl_model_*_steps.zip"), None
+        return os.path.join(path, f"rl_model_{max(steps)}_steps.zip"), max(steps)
+    return os.path.join(path, "best_model.zip" if load_best else f"{env_id}.zip"), None
+
+
+def find_runs(
+    folder: str,
+    algos: List[str],
+    env_ids: Optional[List[str]],
+    exp: Optional[List[str]],
+    load_best: bool = False,
+    load_checkpoint: Optional[int] = None,
+    load_last_checkpoint: bool = False,
+) -> List[Run]:
+    """
+    Collect all runs that have a stored model.
+
+    :param folder: results folder (e.g. docs/results)
+    :param algos: algorithms to include
+    :param env_ids: environments to include, all if None
+    :param exp: only include runs whose folder name contains one of these strings, all if None
+    :param load_best: use ``best_model.zip`` instead of the final ``<env>.zip``
+    :param load_checkpoint: use the checkpoint ``rl_model_<load_checkpoint>_steps.zip`` instead
+    :param load_last_checkpoint: use the checkpoint with the most timesteps instead
+    :return: the runs, sorted by algorithm and name
+    """
+    runs = []
+    for algo in algos:
+        for path in sorted(glob.glob(os.path.join(folder, algo, "*"))):
+            name = os.path.basename(path)
+            if not os.path.isdir(path) or (exp is not None and not any(e in name for e in exp)):
+                continue
+            # the environment id is stored as sub folder with args.yml and config.yml
+            env_dirs = [d for d in os.listdir(path) if os.path.isfile(os.path.join(path, d, "config.yml"))]
+            if len(env_dirs) != 1:
+                continue
+            env_id = env_dirs[0]
+            if env_ids is not None and env_id not in env_ids:
+                continue
+            model_path, checkpoint = model_file(path, env_id, load_best, load_checkpoint, load_last_checkpoint)
+            if not os.path.isfile(model_path):
+                print(f"Skipping {algo}/{name}: {model_path} not found")
+                continue
+            runs.append(Run(algo, env_id, name, path, model_path, run_seed(path, env_id, name), checkpoint))
+    return runs
+
+
+def output_name(run: Run, name_format: str) -> str:
+    """
+    :param run: the rendered run
+    :param name_format: format string with the fields ``algo``, ``env_id``, ``seed``, ``name`` and ``steps``
+        (timesteps of the checkpoint, empty for the final or best model)
+    :return: the file name without extension
+    """
+    steps = "" if run.checkpoint is None else str(run.checkpoint)
+    return name_format.format(algo=run.algo, env_id=run.env_id, seed=run.seed, name=run.name, steps=steps)
+
+
+def output_names(runs: List[Run], name_format: str) -> List[str]:
+    """
+    File names of all runs, see ``output_name``.
+    Runs that would get the same name (e.g. msac/AntBulletEnv-v0_1_state_based and
+    msac/AntBulletEnv-v0_1_action_based share the seed) get the suffix of their folder name appended.
+
+    :param runs: the rendered runs
+    :param name_format: see ``output_name``
+    :return: the file names without extension, in the order of ``runs``
+    """
+    names = [output_name(run, name_format) for run in runs]
+    duplicates = {name for name in names if names.count(name) > 1}
+    for index, run in enumerate(runs):
+        if names[index] in duplicates:
+            prefix = f"{run.env_id}_{run.seed}"
+            suffix = run.name[len(prefix) :] if run.name.startswith(prefix) else f"_{run.name}"
+            names[index] += suffix
+    return names
+
+
+def ffmpeg_command(output_path: str, width: int, height: int, fps: int) -> List[str]:
+    """
+    ffmpeg command that reads raw RGB frames from stdin and encodes them to ``output_path``.
+
+    :param output_path: .mp4 or .gif file
+    :param width: frame width in pixels
+    :param height: frame height in pixels
+    :param fps: frame rate
+    :return: the command line
+    """
+    command = ["ffmpeg", "-y", "-loglevel", "error"]
+    command += ["-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-"]
+    if output_path.endswith(".gif"):
+        # palette generation in a single pass, ffmpeg keeps the frames it needs on its own
+        command += ["-vf", "split[a][b];[a]palettegen[p];[b][p]paletteuse"]
+    else:
+        # yuv420p needs even frame sizes
+        command += ["-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2"]
+        command += ["-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p"]
+    return command + [output_path]
+
+
+def render_run(run: Run, output_path: str, n_timesteps: int, fps: int, deterministic: bool, seed: int) -> str:
+    """
+    Roll out the model of one run and stream the rendered frames to ffmpeg.
+    Runs in a worker process, the heavy imports happen here and not in the parent.
+
+    :param run: run to render
+    :param output_path: video file
+    :param n_timesteps: number of environment steps to record
+    :param fps: frame rate of the video
+    :param deterministic: use deterministic actions
+    :param seed: environment seed
+    :return: a summary line
+    """
+    import gym
+    import torch as th
+    from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize
+
+    from algos import get_algo
+
+    try:
+        import pybullet_envs  # noqa: F401  register the Bullet environments
+    except ImportError:
+        pass
+
+    # one thread per worker, the parallelism comes from the pool
+    th.set_num_threads(1)
+
+    env = gym.make(run.env_id)
+    env.seed(seed)
+    venv = DummyVecEnv([lambda: env])
+    vecnormalize_path = os.path.join(run.path, run.env_id, "vecnormalize.pkl")
+    if os.path.isfile(vecnormalize_path):
+        venv = VecNormalize.load(vecnormalize_path, venv)
+        venv.training = False
+        venv.norm_reward = False
+
+    # custom objects as in the zoo, avoids errors when loading models saved with another python version
+    custom_objects = {"learning_rate": 0.0, "lr_schedule": lambda _: 0.0}
+    model = get_algo(run.algo).load(run.model_path, env=venv, device="cpu", custom_objects=custom_objects)
+
+    encoder = None
+    episode_rewards, episode_reward = [], 0.0
+    try:
+        obs = venv.reset()
+        for _ in range(n_timesteps):
+            frame = env.render(mode="rgb_array")
+            if encoder is None:
+                height, width = frame.shape[:2]
+                encoder = subprocess.Popen(ffmpeg_command(output_path, width, height, fps), stdin=subprocess.PIPE)
+            encoder.stdin.write(frame.tobytes())
+
+            action, _ = model.predict(obs, deterministic=deterministic)
+            obs, reward, done, _ = venv.step(action)
+            episode_reward += float(venv.get_original_reward()[0] if isinstance(venv, VecNormalize) else reward[0])
+            if done[0]:
+                episode_rewards.append(episode_reward)
+                episode_reward = 0.0
+    finally:
+        venv.close()
+        if encoder is not None:
+            encoder.stdin.close()
+            encoder.wait()
+
+    if encoder is None or encoder.returncode != 0:
+        raise RuntimeError(f"Encoding {output_path} failed")
+    mean_reward = sum(episode_rewards) / len(episode_rewards) if episode_rewards else float("nan")
+    return f"{run.algo}/{run.name}: {output_path} ({len(episode_rewards)} episodes, mean reward {mean_reward:.2f})"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--algo", help="RL Algorithms", nargs="+", type=str, default=["sac", "msac"], choices=list(ALGOS))
+    parser.add_argument("--env", help="Environment IDs, all if not set", nargs="+", type=str, default=None)
+    parser.add_argument(
+        "-exp", "--exp", help="Only runs whose folder contains one of these strings", nargs="+", type=str
+    )
+    parser.add_argument("-f", "--folder", help="Results folder", type=str, default="docs/results")
+    parser.add_argument("-o", "--output-folder", help="Output folder", type=str, default="docs/images/videos")
+    parser.add_argument("-n", "--n-timesteps", help="Number of timesteps per video", default=1000, type=int)
+    parser.add_argument("--fps", help="Frame rate", default=30, type=int)
+    parser.add_argument("--n-jobs", help="Number of worker processes", default=os.cpu_count(), type=int)
+    parser.add_argument("--seed", help="Random generator seed", type=int, default=0)
+    parser.add_argument("--load-best", action="store_true", default=False, help="Load best model instead of last model")
+    parser.add_argument(
+        "--load-checkpoint",
+        type=int,
+        help="Load checkpoint instead of last model, you must pass the number of timesteps corresponding to it",
+    )
+    parser.add_argument(
+        "--load-last-checkpoint",
+        action="store_true",
+        default=False,
+        help="Load last checkpoint instead of last model if available",
+    )
+    parser.add_argument(
+        "--name-format",
+        help="Name of the output files, fields: {algo}, {env_id}, {seed}, {name} (run folder), {steps} (checkpoint)",
+        type=str,
+        default="training_{algo}_{env_id}_{seed}",
+    )
+    parser.add_argument("--stochastic", action="store_true", default=False, help="Use stochastic actions")
+    parser.add_argument("--gif", action="store_true", default=False, help="Encode GIFs instead of mp4 videos")
+    args = parser.parse_args()
+
+    runs = find_runs(
+        args.folder, args.algo, args.env, args.exp, args.load_best, args.load_checkpoint, args.load_last_checkpoint
+    )
+    if len(runs) == 0:
+        print(f"No runs with a stored model found in {args.folder}")
+        return 1
+
+    extension = "gif" if args.gif else "mp4"
+    output_paths = [os.path.join(args.output_folder, f"{name}.{extension}") for name in output_names(runs, args.name_format)]
+    # only left if --name-format drops fields that the folder suffix does not replace, e.g. {algo}
+    duplicates = sorted({path for path in output_paths if output_paths.count(path) > 1})
+    if duplicates:
+        print(f"Several runs would be written to {', '.join(duplicates)}")
+        print("Add {algo} or {name} to --name-format")
+        return 1
+
+    os.makedirs(args.output_folder, exist_ok=True)
+    failed = False
+    # workers are forked from a server that already imported the algorithms
+    context = worker_context(*args.algo)
+    with ProcessPoolExecutor(max_workers=min(args.n_jobs, len(runs)), mp_context=context) as executor:
+        futures = {}
+        for run, output_path in zip(runs, output_paths):
+            future = executor.submit(
+                render_run, run, output_path, args.n_timesteps, args.fps, not args.stochastic, args.seed
+            )
+            futures[future] = run
+        for future in as_completed(futures):
+            run = futures[future]
+            try:
+                print(future.result())
+            except Exception as e:
+                print(f"{run.algo}/{run.name}: failed ({e})")
+                failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the scripts are not installed, make them and the algos package importable
+SCRIPTS_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SCRIPTS_FOLDER not in sys.path:
+    sys.path.insert(0, SCRIPTS_FOLDER)
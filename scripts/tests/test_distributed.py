@@ -0,0 +1,195 @@
+import os
+
+import numpy as np
+import pytest
+
+th = pytest.importorskip("torch")
+pytest.importorskip("stable_baselines3")
+
+import torch.distributed as dist  # noqa: E402
+import torch.multiprocessing as mp  # noqa: E402
+from stable_baselines3.common.logger import Logger  # noqa: E402
+
+from algos import msac  # noqa: E402
+from algos.distributed import batch_max, batch_mean, batch_median, batch_min  # noqa: E402
+from algos.msac import MSAC  # noqa: E402
+
+WORLD_SIZE = 2
+BATCH_SIZE = 16
+
+MODES = [
+    # (munchausen_mode, munchausen_state_based, use_sde)
+    ("dynamicshift", True, False),
+    ("dynamicshift_clipping", True, False),
+    ("dynamicshift", False, False),
+    ("dynamicshift_median", False, False),
+    ("dynamicshift_minmax", False, False),
+    ("dynamicshift_normalized", False, False),
+    # gSDE as in the stored configs: the actions come from the exploration matrix,
+    # which has to be the same on all ranks although every rank has its own seed
+    ("dynamicshift", True, True),
+    ("dynamicshift_normalized", False, True),
+]
+
+
+def _deterministic_rsample(self, sample_shape=th.Size()):
+    # the policy noise has to be the same for a transition in the single process batch
+    # and in a shard, so it is derived from the distribution parameters instead of the RNG
+    return self.loc + self.scale * th.sin(1e3 * self.loc.detach())
+
+
+def _replay_action_log_prob(actor):
+    # log prob of the replay buffer actions, provided by the Munchausen fork of stable-baselines3
+    def replay_action_log_prob(actions, obs):
+        mean_actions, log_std, kwargs = actor.get_action_dist_params(obs)
+        actor.action_dist.proba_distribution(mean_actions, log_std, **kwargs)
+        return actions, actor.action_dist.log_prob(actions)
+
+    return replay_action_log_prob
+
+
+class _TargetRecorder:
+    """Replaces ``torch.nn.functional`` in msac.py and keeps the target Q-values of the critic loss."""
+
+    def __init__(self):
+        self.targets = None
+
+    def mse_loss(self, input, target):
+        self.targets = target.detach().clone()
+        return th.nn.functional.mse_loss(input, target)
+
+
+def _make_model(mode, state_based, use_sde, batch_indices, distributed, seed=0):
+    """MSAC with a fixed replay buffer, ``sample`` returns the transitions ``batch_indices``."""
+    model = MSAC(
+        "MlpPolicy",
+        "Pendulum-v1",
+        buffer_size=BATCH_SIZE,
+        learning_starts=0,
+        munchausen_mode=mode,
+        munchausen_state_based=state_based,
+        dynamicshift_hyperparameter=-0.5,
+        use_sde=use_sde,
+        # the first Adam step is about lr * sign(grad): rounding differences of tiny gradients
+        # would show up as parameter differences, with SGD the update is linear in the gradient
+        policy_kwargs=dict(optimizer_class=th.optim.SGD),
+        seed=seed,
+        device="cpu",
+        distributed=distributed,
+    )
+    model.set_logger(Logger(folder=None, output_formats=[]))
+    if not hasattr(model.actor, "replay_action_log_prob"):
+        model.actor.replay_action_log_prob = _replay_action_log_prob(model.actor)
+    # running extremes of dynamicshift_normalized
+    model.log_prob_min = th.tensor(float("inf"))
+    model.log_prob_max = th.tensor(float("-inf"))
+
+    rng = np.random.RandomState(42)
+    buffer = model.replay_buffer
+    buffer.observations[:] = rng.uniform(-1, 1, buffer.observations.shape)
+    buffer.next_observations[:] = rng.uniform(-1, 1, buffer.next_observations.shape)
+    buffer.actions[:] = rng.uniform(-0.9, 0.9, buffer.actions.shape)
+    buffer.rewards[:] = rng.uniform(-10, 0, buffer.rewards.shape)
+    buffer.dones[:] = rng.uniform(0, 1, buffer.dones.shape) < 0.2
+    buffer.full = True
+
+    def sample(batch_size, env=None):
+        assert batch_size == len(batch_indices)
+        return buffer._get_samples(batch_indices, env=env)
+
+    buffer.sample = sample
+
+    # keep the gradients each optimizer stepped with (after the all-reduce)
+    model.step_gradients = {}
+    optimizers = {"actor": model.actor.optimizer, "critic": model.critic.optimizer, "ent_coef": model.ent_coef_optimizer}
+    for key, optimizer in optimizers.items():
+        optimizer.step = _record_gradients(optimizer, model.step_gradients, key)
+    return model
+
+
+def _record_gradients(optimizer, gradients, key):
+    step = optimizer.step
+
+    def record_and_step(*args, **kwargs):
+        for group_index, group in enumerate(optimizer.param_groups):
+            for param_index, param in enumerate(group["params"]):
+                gradients[f"{key}.{group_index}.{param_index}"] = param.grad.clone()
+        return step(*args, **kwargs)
+
+    return record_and_step
+
+
+def _state(model, recorder):
+    return {
+        "parameters": {name: param.detach().clone() for name, param in model.policy.named_parameters()},
+        "log_ent_coef": model.log_ent_coef.detach().clone(),
+        "gradients": model.step_gradients,
+        "targets": recorder.targets,
+    }
+
+
+def _init_process_group(rank, store_path):
+    th.set_num_threads(1)
+    dist.init_process_group("gloo", init_method=f"file://{store_path}", rank=rank, world_size=WORLD_SIZE)
+
+
+def _train_rank(rank, store_path, output_folder, mode, state_based, use_sde):
+    _init_process_group(rank, store_path)
+    if not use_sde:
+        th.distributions.Normal.rsample = _deterministic_rsample
+    recorder = msac.F = _TargetRecorder()
+    shard = BATCH_SIZE // WORLD_SIZE
+    batch_indices = np.arange(rank * shard, (rank + 1) * shard)
+    # seeded per rank like train_msac_distributed.py
+    model = _make_model(mode, state_based, use_sde, batch_indices, distributed=True, seed=rank)
+    model.train(gradient_steps=1, batch_size=BATCH_SIZE)
+    th.save(_state(model, recorder), os.path.join(output_folder, f"{rank}.pt"))
+    dist.destroy_process_group()
+
+
+def _statistics_rank(rank, store_path, output_folder):
+    _init_process_group(rank, store_path)
+    shard = th.arange(8, dtype=th.float32).reshape(-1, 1) * (rank + 1) - 3 * rank
+    statistics = [batch_mean(shard, True), batch_median(shard, True), batch_min(shard, True), batch_max(shard, True)]
+    th.save(th.stack(statistics), os.path.join(output_folder, f"{rank}.pt"))
+    dist.destroy_process_group()
+
+
+@pytest.mark.parametrize("mode, state_based, use_sde", MODES)
+def test_distributed_train_matches_single_process(tmp_path, monkeypatch, mode, state_based, use_sde):
+    if not use_sde:
+        monkeypatch.setattr(th.distributions.Normal, "rsample", _deterministic_rsample)
+    recorder = _TargetRecorder()
+    monkeypatch.setattr(msac, "F", recorder)
+    mp.spawn(
+        _train_rank,
+        args=(str(tmp_path / "store"), str(tmp_path), mode, state_based, use_sde),
+        nprocs=WORLD_SIZE,
+        join=True,
+    )
+
+    reference = _make_model(mode, state_based, use_sde, np.arange(BATCH_SIZE), distributed=False)
+    reference.train(gradient_steps=1, batch_size=BATCH_SIZE)
+    expected = _state(reference, recorder)
+
+    shard = BATCH_SIZE // WORLD_SIZE
+    for rank in range(WORLD_SIZE):
+        state = th.load(os.path.join(tmp_path, f"{rank}.pt"))
+        # the targets of a shard are the ones of its transitions in the whole batch
+        assert th.allclose(state["targets"], expected["targets"][rank * shard : (rank + 1) * shard], atol=1e-5)
+        for name, value in expected["parameters"].items():
+            assert th.allclose(state["parameters"][name], value, atol=1e-6), name
+        assert th.allclose(state["log_ent_coef"], expected["log_ent_coef"], atol=1e-6)
+        assert state["gradients"].keys() == expected["gradients"].keys()
+        for name, value in expected["gradients"].items():
+            assert th.allclose(state["gradients"][name], value, rtol=1e-4, atol=1e-6), name
+
+
+def test_batch_statistics_across_ranks(tmp_path):
+    mp.spawn(_statistics_rank, args=(str(tmp_path / "store"), str(tmp_path)), nprocs=WORLD_SIZE, join=True)
+
+    shards = [th.arange(8, dtype=th.float32).reshape(-1, 1) * (rank + 1) - 3 * rank for rank in range(WORLD_SIZE)]
+    batch = th.cat(shards)
+    expected = th.stack([th.mean(batch), th.median(batch), th.min(batch), th.max(batch)])
+    for rank in range(WORLD_SIZE):
+        assert th.allclose(th.load(os.path.join(tmp_path, f"{rank}.pt")), expected)
@@ -0,0 +1,52 @@
+import os
+import statistics
+
+import pytest
+
+from benchmark_import_time import (
+    ALGOS_IMPORT_BUDGET_MS,
+    MSAC_IMPORT_BUDGET_MS,
+    PRELOADED_WORKER_BUDGET_MS,
+    heavy_modules,
+    measure,
+    preloaded_worker_startup_ms,
+)
+
+REPEATS = 3
+
+
+def test_algos_package_is_light():
+    # the parent of a worker pool only imports the package, the algorithms load in the workers
+    cumulative = measure("algos")
+    assert heavy_modules(cumulative) == []
+    assert cumulative["algos"] / 1000 < ALGOS_IMPORT_BUDGET_MS
+
+
+def test_msac_import_budget():
+    pytest.importorskip("torch")
+    pytest.importorskip("stable_baselines3")
+    timings_ms = [measure("algos.msac")["algos.msac"] / 1000 for _ in range(REPEATS)]
+    assert statistics.median(timings_ms) < MSAC_IMPORT_BUDGET_MS
+
+
+def test_preloaded_worker_startup_budget():
+    pytest.importorskip("torch")
+    pytest.importorskip("stable_baselines3")
+    # without preloading every worker pays the msac import again
+    assert statistics.median(preloaded_worker_startup_ms("msac", REPEATS)) < PRELOADED_WORKER_BUDGET_MS
+
+
+def test_worker_context_keeps_environment():
+    from concurrent.futures import ProcessPoolExecutor
+
+    from algos import worker_context
+
+    python_path = os.environ.get("PYTHONPATH")
+    context = worker_context("msac")
+    assert os.environ.get("PYTHONPATH") == python_path
+    # the scripts folder is only on the PYTHONPATH of the fork server while it starts,
+    # the workers (and e.g. the ffmpeg they run) see the environment of the caller
+    scripts_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        worker_python_path = executor.submit(os.getenv, "PYTHONPATH").result()
+    assert scripts_folder not in (worker_python_path or "").split(os.pathsep)
@@ -0,0 +1,102 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from plot_monitor import Welford, find_monitor_files, rolling_on_grid
+
+RESULTS_FOLDER = os.path.join(os.path.dirname(__file__), "..", "..", "docs", "results")
+STORED_MONITOR_FILE = os.path.join(RESULTS_FOLDER, "sac", "MountainCarContinuous-v0_1", "0.monitor.csv")
+
+
+def _write_monitor(path, rewards, lengths):
+    with open(path, "w") as f:
+        f.write("#" + json.dumps({"t_start": 0.0, "env_id": "Test-v0"}) + "\n")
+        pd.DataFrame({"r": rewards, "l": lengths, "t": np.arange(len(rewards), dtype=float)}).to_csv(f, index=False)
+    return path
+
+
+def _pandas_rolling_on_grid(path, grid, window):
+    """Reference with the whole file in memory."""
+    monitor = pd.read_csv(path, skiprows=1)
+    rolling = monitor["r"].rolling(window, min_periods=1)
+    mean, std = rolling.mean().to_numpy(), rolling.std(ddof=0).to_numpy()
+    timesteps = monitor["l"].cumsum().to_numpy()
+    episode = np.searchsorted(timesteps, grid, side="right") - 1
+    inside = (episode >= 0) & (grid <= timesteps[-1])
+    episode = np.clip(episode, 0, None)
+    return np.where(inside, mean[episode], np.nan), np.where(inside, std[episode], np.nan)
+
+
+@pytest.fixture
+def monitor_file(tmp_path):
+    rng = np.random.RandomState(0)
+    n_episodes = 257
+    # large offset: the variance must not suffer from cancellation
+    rewards = 1e6 + rng.normal(0, 1, n_episodes)
+    lengths = rng.randint(1, 40, n_episodes)
+    return _write_monitor(str(tmp_path / "0.monitor.csv"), rewards, lengths)
+
+
+@pytest.mark.parametrize("chunksize", [1, 7, 19, 20, 21, 100, 1000])
+def test_rolling_on_grid_matches_pandas(monitor_file, chunksize):
+    window = 20
+    # grid points before the first episode, between episodes, on episode ends and after the run
+    grid = np.linspace(0, 6000, 301)
+    mean, std = rolling_on_grid(monitor_file, grid, window, chunksize)
+    expected_mean, expected_std = _pandas_rolling_on_grid(monitor_file, grid, window)
+    np.testing.assert_allclose(mean, expected_mean, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(std, expected_std, rtol=1e-6, atol=1e-6)
+    assert np.isnan(mean[0]) and np.isnan(mean[-1])
+
+
+@pytest.mark.parametrize("chunksize", [333, 1000, 10000])
+def test_rolling_on_grid_matches_pandas_on_stored_run(chunksize):
+    grid = np.linspace(1000, 200000, 200)
+    mean, std = rolling_on_grid(STORED_MONITOR_FILE, grid, 500, chunksize)
+    expected_mean, expected_std = _pandas_rolling_on_grid(STORED_MONITOR_FILE, grid, 500)
+    np.testing.assert_allclose(mean, expected_mean, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(std, expected_std, rtol=1e-6, atol=1e-6)
+
+
+def test_welford_matches_pandas_with_runs_of_different_length(tmp_path):
+    rng = np.random.RandomState(1)
+    grid = np.linspace(25, 1400, 56)
+    seeds = []
+    for seed, n_episodes in enumerate([20, 75, 150]):
+        path = _write_monitor(
+            str(tmp_path / f"{seed}.monitor.csv"), rng.normal(seed, 1, n_episodes), rng.randint(10, 30, n_episodes)
+        )
+        seeds.append(rolling_on_grid(path, grid, 10, 16)[0])
+    # shorter runs end earlier, the tail is NaN
+    assert np.isnan(seeds[0][-1]) and not np.isnan(seeds[2][-1])
+
+    accumulator = Welford(grid.shape)
+    for values in seeds:
+        accumulator.update(values)
+    mean, std = accumulator.result()
+
+    frame = pd.DataFrame(np.stack(seeds, axis=1))
+    np.testing.assert_allclose(mean, frame.mean(axis=1).to_numpy(), rtol=1e-12)
+    np.testing.assert_allclose(std, frame.std(axis=1, ddof=0).to_numpy(), rtol=1e-9, atol=1e-12)
+    np.testing.assert_array_equal(accumulator.count, frame.count(axis=1).to_numpy())
+
+
+def test_welford_without_values_is_nan():
+    accumulator = Welford((3,))
+    accumulator.update(np.array([1.0, np.nan, np.nan]))
+    accumulator.update(np.array([3.0, 2.0, np.nan]))
+    mean, std = accumulator.result()
+    np.testing.assert_array_equal(mean[:2], [2.0, 2.0])
+    np.testing.assert_array_equal(std[:2], [1.0, 0.0])
+    assert np.isnan(mean[2]) and np.isnan(std[2])
+
+
+def test_find_monitor_files_groups_seeds():
+    groups = find_monitor_files(RESULTS_FOLDER, ["sac", "msac"], "MountainCarContinuous-v0", ["state_based"])
+    assert list(groups) == ["MSAC state_based"]
+    assert len(groups["MSAC state_based"]) == 3
+    groups = find_monitor_files(RESULTS_FOLDER, ["sac"], "MountainCarContinuous-v0", [])
+    assert list(groups) == ["SAC"] and len(groups["SAC"]) == 3
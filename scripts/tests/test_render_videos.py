@@ -0,0 +1,120 @@
+import os
+import shutil
+import subprocess
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+import yaml
+
+from render_videos import Run, ffmpeg_command, find_runs, model_file, output_name, output_names
+
+DEFAULT_NAME_FORMAT = "training_{algo}_{env_id}_{seed}"
+
+
+def _add_run(folder, algo, name, env_id, seed=None, files=()):
+    """Run folder in the layout of docs/results, ``args.yml`` is written like the zoo does."""
+    path = os.path.join(folder, algo, name)
+    os.makedirs(os.path.join(path, env_id))
+    with open(os.path.join(path, env_id, "config.yml"), "w") as f:
+        yaml.dump(OrderedDict([("policy", "MlpPolicy")]), f)
+    if seed is not None:
+        with open(os.path.join(path, env_id, "args.yml"), "w") as f:
+            yaml.dump(OrderedDict([("algo", algo), ("env", env_id), ("seed", seed)]), f)
+    for file in files:
+        open(os.path.join(path, file), "w").close()
+    return path
+
+
+@pytest.fixture
+def results(tmp_path):
+    folder = str(tmp_path)
+    _add_run(folder, "sac", "AntBulletEnv-v0_1", "AntBulletEnv-v0", 1, ["AntBulletEnv-v0.zip", "best_model.zip"])
+    for suffix in ("state_based", "action_based"):
+        checkpoints = [f"rl_model_{steps}_steps.zip" for steps in (1000, 3000, 20000)]
+        _add_run(folder, "msac", f"AntBulletEnv-v0_1_{suffix}", "AntBulletEnv-v0", 1, ["AntBulletEnv-v0.zip"] + checkpoints)
+    # no args.yml, the seed is taken from the folder name
+    _add_run(folder, "msac", "HopperBulletEnv-v0_3_state_based", "HopperBulletEnv-v0", files=["HopperBulletEnv-v0.zip"])
+    # no stored model
+    _add_run(folder, "msac", "Walker2DBulletEnv-v0_1_state_based", "Walker2DBulletEnv-v0", 1)
+    # no environment sub folder
+    os.makedirs(os.path.join(folder, "msac", "logs"))
+    return folder
+
+
+def test_find_runs(results):
+    runs = find_runs(results, ["sac", "msac"], None, None)
+    assert [(run.algo, run.name, run.seed) for run in runs] == [
+        ("sac", "AntBulletEnv-v0_1", 1),
+        ("msac", "AntBulletEnv-v0_1_action_based", 1),
+        ("msac", "AntBulletEnv-v0_1_state_based", 1),
+        ("msac", "HopperBulletEnv-v0_3_state_based", 3),
+    ]
+    assert all(run.checkpoint is None and run.model_path.endswith(f"{run.env_id}.zip") for run in runs)
+
+    runs = find_runs(results, ["sac", "msac"], ["AntBulletEnv-v0"], ["state_based"])
+    assert [run.name for run in runs] == ["AntBulletEnv-v0_1_state_based"]
+    runs = find_runs(results, ["sac", "msac"], None, None, load_best=True)
+    assert [run.model_path for run in runs] == [os.path.join(results, "sac", "AntBulletEnv-v0_1", "best_model.zip")]
+
+
+def test_model_file(results):
+    path = os.path.join(results, "msac", "AntBulletEnv-v0_1_state_based")
+    assert model_file(path, "AntBulletEnv-v0", False, None, False) == (os.path.join(path, "AntBulletEnv-v0.zip"), None)
+    assert model_file(path, "AntBulletEnv-v0", True, None, False) == (os.path.join(path, "best_model.zip"), None)
+    assert model_file(path, "AntBulletEnv-v0", False, 3000, False) == (os.path.join(path, "rl_model_3000_steps.zip"), 3000)
+    # the most timesteps, not the last file name
+    assert model_file(path, "AntBulletEnv-v0", False, None, True) == (os.path.join(path, "rl_model_20000_steps.zip"), 20000)
+
+    runs = find_runs(results, ["sac", "msac"], None, None, load_last_checkpoint=True)
+    assert [(run.name, run.checkpoint) for run in runs] == [
+        ("AntBulletEnv-v0_1_action_based", 20000),
+        ("AntBulletEnv-v0_1_state_based", 20000),
+    ]
+
+
+def test_output_name():
+    run = Run("msac", "AntBulletEnv-v0", "AntBulletEnv-v0_2_state_based", "", "", 2, 5000)
+    assert output_name(run, DEFAULT_NAME_FORMAT) == "training_msac_AntBulletEnv-v0_2"
+    assert output_name(run, "{name}_{steps}") == "AntBulletEnv-v0_2_state_based_5000"
+    assert output_name(run._replace(checkpoint=None), "{algo}{steps}") == "msac"
+
+
+def test_output_names(results):
+    # the default command renders every run, names that collide get the folder suffix
+    runs = find_runs(results, ["sac", "msac"], None, None)
+    assert output_names(runs, DEFAULT_NAME_FORMAT) == [
+        "training_sac_AntBulletEnv-v0_1",
+        "training_msac_AntBulletEnv-v0_1_action_based",
+        "training_msac_AntBulletEnv-v0_1_state_based",
+        "training_msac_HopperBulletEnv-v0_3",
+    ]
+    runs = find_runs(results, ["msac"], None, ["state_based"])
+    assert output_names(runs, DEFAULT_NAME_FORMAT) == ["training_msac_AntBulletEnv-v0_1", "training_msac_HopperBulletEnv-v0_3"]
+
+
+def test_ffmpeg_command():
+    command = ffmpeg_command("out.gif", 33, 21, 30)
+    assert command[:2] == ["ffmpeg", "-y"] and command[-1] == "out.gif"
+    assert command[command.index("-s") + 1] == "33x21" and command[command.index("-i") + 1] == "-"
+    assert "palettegen" in command[command.index("-vf") + 1]
+
+    command = ffmpeg_command("out.mp4", 33, 21, 30)
+    assert command[-1] == "out.mp4"
+    assert command[command.index("-c:v") + 1] == "libx264"
+    assert command[command.index("-pix_fmt", command.index("-i")) + 1] == "yuv420p"
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+@pytest.mark.parametrize("extension", ["mp4", "gif"])
+def test_ffmpeg_encodes_streamed_frames(tmp_path, extension):
+    # odd frame size, yuv420p needs the padding
+    height, width = 21, 33
+    output_path = str(tmp_path / f"video.{extension}")
+    encoder = subprocess.Popen(ffmpeg_command(output_path, width, height, 30), stdin=subprocess.PIPE)
+    for index in range(10):
+        frame = np.full((height, width, 3), 25 * index, dtype=np.uint8)
+        encoder.stdin.write(frame.tobytes())
+    encoder.stdin.close()
+    assert encoder.wait() == 0
+    assert os.path.getsize(output_path) > 0
@@ -0,0 +1,172 @@
+"""
+Data-parallel M-SAC training on CPU with torch.distributed (gloo backend).
+
+Each rank runs its own environment and replay buffer, the minibatch of every
+gradient step is split over the ranks. The hyperparameters are read like in the
+zoo, either from the zoo hyperparameter file (entry of ``--env``) or from the
+``config.yml`` of a stored run, and can be overwritten with ``--hyperparams``.
+Launch one process per rank, e.g. four processes on one machine:
+`torchrun --nproc_per_node 4 scripts/train_msac_distributed.py --env HalfCheetahBulletEnv-v0 --batch-size 4096`
+`torchrun --nproc_per_node 4 scripts/train_msac_distributed.py --env AntBulletEnv-v0 --batch-size 4096
+--config docs/results/msac/AntBulletEnv-v0_1_state_based/AntBulletEnv-v0/config.yml`
+
+On several nodes pass ``--nnodes``, ``--node_rank`` and ``--master_addr`` to torchrun.
+"""
+import argparse
+import os
+from typing import Any, Callable, Dict
+
+import gym
+import torch as th
+import torch.distributed as dist
+import yaml
+
+from algos import MSAC
+
+# hyperparameters given as python expressions in the zoo files
+EVAL_KEYS = ("policy_kwargs", "replay_buffer_kwargs")
+# zoo features that change the environment per rank and are not supported here
+UNSUPPORTED_KEYS = ("normalize", "n_envs", "frame_stack", "env_wrapper", "vec_env_wrapper", "callback")
+
+
+class StoreDict(argparse.Action):
+    """
+    Custom argparse action for storing dict, as in the zoo.
+
+    In: args1:0.0 args2:"dict(a=1)"
+    Out: {'args1': 0.0, arg2: dict(a=1)}
+    """
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        arg_dict = {}
+        for arguments in values:
+            key, value = arguments.split(":", 1)
+            arg_dict[key] = eval(value)
+        setattr(namespace, self.dest, arg_dict)
+
+
+def linear_schedule(initial_value: float) -> Callable[[float], float]:
+    """
+    Linear learning rate schedule, as ``lin_<value>`` in the zoo.
+
+    :param initial_value: learning rate at the start of the training
+    :return: schedule of the progress remaining (from 1 to 0)
+    """
+
+    def func(progress_remaining: float) -> float:
+        return progress_remaining * initial_value
+
+    return func
+
+
+def load_hyperparams(env_id: str, yaml_file: str, config: str) -> Dict[str, Any]:
+    """
+    :param env_id: environment ID, selects the entry of ``yaml_file``
+    :param yaml_file: zoo hyperparameter file, e.g. rl-baselines3-zoo/hyperparams/msac.yml
+    :param config: ``config.yml`` of a stored run, used instead of ``yaml_file`` if given
+    :return: the raw hyperparameters
+    """
+    if config is not None:
+        with open(config) as f:
+            return dict(yaml.load(f, Loader=yaml.UnsafeLoader))
+    with open(yaml_file) as f:
+        hyperparams_dict = yaml.load(f, Loader=yaml.UnsafeLoader)
+    if env_id not in hyperparams_dict:
+        raise ValueError(f"Hyperparameters not found for msac-{env_id} in {yaml_file}")
+    return dict(hyperparams_dict[env_id])
+
+
+def preprocess_hyperparams(hyperparams: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert the zoo hyperparameters into ``MSAC`` keyword arguments.
+
+    :param hyperparams: raw hyperparameters, ``n_timesteps`` and ``policy`` are kept
+    :return: the processed hyperparameters
+    """
+    unsupported = [key for key in UNSUPPORTED_KEYS if key in hyperparams]
+    if unsupported:
+        raise ValueError(f"Not supported with distributed training: {', '.join(unsupported)}")
+    for key in EVAL_KEYS:
+        if isinstance(hyperparams.get(key), str):
+            hyperparams[key] = eval(hyperparams[key])
+    learning_rate = hyperparams.get("learning_rate", 3e-4)
+    if isinstance(learning_rate, str) and learning_rate.startswith("lin_"):
+        hyperparams["learning_rate"] = linear_schedule(float(learning_rate.split("_")[1]))
+    if isinstance(hyperparams.get("train_freq"), list):
+        hyperparams["train_freq"] = tuple(hyperparams["train_freq"])
+    return hyperparams
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--env", help="environment ID", type=str, default="HalfCheetahBulletEnv-v0")
+    parser.add_argument(
+        "-n", "--n-timesteps", help="Overwrite the number of timesteps per rank", default=-1, type=int
+    )
+    parser.add_argument(
+        "--batch-size", help="Overwrite the global minibatch size, split over all ranks", default=None, type=int
+    )
+    parser.add_argument(
+        "-yaml",
+        "--yaml-file",
+        help="Zoo hyperparameter file",
+        default="rl-baselines3-zoo/hyperparams/msac.yml",
+        type=str,
+    )
+    parser.add_argument("--config", help="config.yml of a stored run, replaces --yaml-file", default=None, type=str)
+    parser.add_argument(
+        "-params",
+        "--hyperparams",
+        type=str,
+        nargs="+",
+        action=StoreDict,
+        help="Overwrite hyperparameter (e.g. munchausen_mode:\"'dynamicshift'\" dynamicshift_hyperparameter:-10.0)",
+    )
+    parser.add_argument("--seed", help="Random generator seed, offset by the rank", type=int, default=1)
+    parser.add_argument("--num-threads", help="Number of torch threads per rank", type=int, default=1)
+    parser.add_argument("--tensorboard-log", help="Tensorboard log dir (rank 0 only)", default=None, type=str)
+    parser.add_argument("-f", "--log-folder", help="Folder the final model is saved to (rank 0)", default="logs", type=str)
+    args = parser.parse_args()
+
+    hyperparams = load_hyperparams(args.env, args.yaml_file, args.config)
+    if args.hyperparams is not None:
+        hyperparams.update(args.hyperparams)
+    if args.batch_size is not None:
+        hyperparams["batch_size"] = args.batch_size
+    hyperparams = preprocess_hyperparams(hyperparams)
+    config_timesteps = hyperparams.pop("n_timesteps")
+    n_timesteps = args.n_timesteps if args.n_timesteps > 0 else int(config_timesteps)
+    policy = hyperparams.pop("policy")
+
+    # torchrun sets MASTER_ADDR, MASTER_PORT, RANK and WORLD_SIZE
+    dist.init_process_group(backend="gloo")
+    rank = dist.get_rank()
+    th.set_num_threads(args.num_threads)
+    if rank == 0:
+        print(f"Hyperparameters: {hyperparams}")
+
+    try:
+        import pybullet_envs  # noqa: F401  register the Bullet environments
+    except ImportError:
+        pass
+
+    model = MSAC(
+        policy,
+        gym.make(args.env),
+        tensorboard_log=args.tensorboard_log if rank == 0 else None,
+        verbose=1 if rank == 0 else 0,
+        seed=args.seed + rank,
+        device="cpu",
+        distributed=True,
+        **hyperparams,
+    )
+    model.learn(total_timesteps=n_timesteps)
+
+    if rank == 0:
+        os.makedirs(args.log_folder, exist_ok=True)
+        model.save(os.path.join(args.log_folder, f"msac_{args.env}_distributed"))
+    dist.destroy_process_group()
+
+
+if __name__ == "__main__":
+    main()